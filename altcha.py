@@ -1,12 +1,109 @@
+"""Solve the ALTCHA proof-of-work captcha using a Playwright-driven Chromium.
+
+If uvloop is installed, `run` uses it as the event loop, which lowers the
+overhead of the many small awaits made while driving the browser. It is
+optional - without it the default asyncio loop is used.
+"""
 import asyncio
+import json
+import os
 import random
+import re
 import time
-from playwright.async_api import async_playwright, Page, Response
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright, ElementHandle, Page, Response
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 import logging
-from typing import Optional, Dict, Any
+from typing import Dict
+
+import requests
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 logger = logging.getLogger(__name__)
 
+# Returns which success indicator is present, or false while the proof-of-work is still running
+POW_DONE_JS = """(widget) => {
+    widget = widget || document.querySelector('altcha-widget');
+    if (!widget) return false;
+    const hidden = widget.querySelector("input[type='hidden'][name='altcha']");
+    if (hidden && hidden.value && hidden.value.length > 50) {  // The JWT token is quite long
+        return {src: 'hidden', length: hidden.value.length};
+    }
+    if (widget.querySelector(".altcha[data-state='verified']")) return {src: 'state'};
+    const label = widget.querySelector('.altcha-label');
+    if (label && label.innerText.trim() === 'Verified') return {src: 'label'};
+    return false;
+}"""
+
+# Snapshot of the widget, or null if it is not on the page
+PROBE_JS = """(widget) => {
+    widget = widget || document.querySelector('altcha-widget');
+    if (!widget) return null;
+    const hidden = widget.querySelector("input[type='hidden'][name='altcha']");
+    const stateDiv = widget.querySelector('.altcha[data-state]');
+    const label = widget.querySelector('.altcha-label');
+    return {
+        value: hidden ? hidden.value : null,
+        state: stateDiv ? stateDiv.getAttribute('data-state') : null,
+        label: label ? label.innerText.trim() : null,
+    };
+}"""
+
+# Images, media and fonts play no part in solving the captcha, so needn't be downloaded.
+# Matched on URL rather than resource type so that other requests never pass through a
+# route handler. Stylesheets are still loaded since they affect where the checkbox and
+# Continue button are on the page, and whether they count as visible.
+BLOCKED_ASSETS_RE = re.compile(
+    r"\.(?:png|jpe?g|gif|webp|svg|ico|bmp|woff2?|ttf|otf|eot|mp4|webm|mp3|ogg)(?:[?#]|$)",
+    re.IGNORECASE,
+)
+
+# Checked state and viewport position of a checkbox (box is null when it is not rendered)
+CHECKBOX_STATE_JS = """(el) => {
+    const rect = el.getBoundingClientRect();
+    const rendered = rect.width > 0 || rect.height > 0;
+    return {
+        checked: el.checked,
+        box: rendered ? {x: rect.x, y: rect.y, width: rect.width, height: rect.height} : null,
+    };
+}"""
+
+# Reports changes of the widget's data-state attribute as console messages
+STATE_LOG_PREFIX = "altcha-state:"
+WATCH_STATE_JS = """([widget, prefix]) => {
+    widget = widget || document.querySelector('altcha-widget');
+    if (!widget) return;
+    let lastState = null;
+    const report = () => {
+        const div = widget.querySelector('.altcha[data-state]');
+        const state = div && div.getAttribute('data-state');
+        if (state && state !== lastState) {
+            lastState = state;
+            console.log(prefix + state);
+        }
+    };
+    report();
+    new MutationObserver(report).observe(widget, {attributes: true, attributeFilter: ['data-state'], subtree: true});
+}"""
+
+
+# Dedicated generator for mouse gestures, so their randomness doesn't depend on the global one
+_mouse_rng = random.Random()
+
+
+def curved_path(start_x, start_y, target_x, target_y, steps):
+    """Points from start towards target, bowed downwards (bezier-like), excluding the target."""
+    dx = target_x - start_x
+    dy = target_y - start_y
+    return [
+        (start_x + dx * progress, start_y + dy * progress + 120 * progress * (1 - progress))
+        for progress in (i / steps for i in range(steps))
+    ]
+
 
 class CaptchaTestError(Exception):
     """Base exception for captcha testing errors"""
@@ -14,105 +111,159 @@ class CaptchaTestError(Exception):
 
 
 class CaptchaTester:
-    def __init__(self, captcha_page_url: str, challenge_url_pattern: str = "ProtectCaptcha=1"):
+    __slots__ = ('captcha_page_url', 'challenge_url_pattern', 'slow_mo_ms', '_handles', '_challenge')
+
+    def __init__(self, captcha_page_url: str, challenge_url_pattern: str = "ProtectCaptcha=1",
+                 slow_mo_ms: int = 0):
         self.captcha_page_url = captcha_page_url
         self.challenge_url_pattern = challenge_url_pattern
-        self.challenge_response: Optional[Dict[Any, Any]] = None
-        
+        # Delay Playwright adds after every action - only useful when watching a visible browser
+        self.slow_mo_ms = slow_mo_ms
+        # Element handles resolved once and reused until the page navigates
+        self._handles: Dict[str, ElementHandle] = {}
+        # Future for the widget's challenge response, set up before the captcha page loads
+        self._challenge = None
+
+    def _remember_handle(self, page: Page, name: str, handle: ElementHandle):
+        if not self._handles:
+            page.once("framenavigated", lambda frame: self._invalidate_handles())
+        self._handles[name] = handle
+
+    def _invalidate_handles(self):
+        self._handles.clear()
+
     async def random_delay(self, min_ms: int, max_ms: int):
         """Add a random human-like delay"""
         delay = random.uniform(min_ms, max_ms) / 1000
         await asyncio.sleep(delay)
     
-    async def response_handler(self, response: Response):
-        """Intercept and capture ALTCHA challenge responses"""
+    async def log_challenge(self, response: Response):
+        """Log the ALTCHA challenge response"""
+        logger.info(f"📡 Captured ALTCHA challenge endpoint: {response.url}")
         try:
-            url = response.url
-            if self.challenge_url_pattern in url:
-                logger.info(f"📡 Captured ALTCHA challenge endpoint: {url}")
-                try:
-                    self.challenge_response = await response.json()
-                    logger.info(f"📦 Challenge data received: {list(self.challenge_response.keys()) if isinstance(self.challenge_response, dict) else 'data'}")
-                except Exception as e:
-                    logger.warning(f"Challenge response was not JSON: {e}")
-                    try:
-                        text_response = await response.text()
-                        self.challenge_response = {"raw": text_response}
-                        logger.info(f"📦 Challenge text data: {text_response[:100]}...")
-                    except:
-                        pass
+            challenge = await response.json()
+            logger.info(f"📦 Challenge data received: {list(challenge.keys()) if isinstance(challenge, dict) else 'data'}")
         except Exception as e:
-            logger.error(f"Error in response handler: {e}")
-    
+            logger.warning(f"Challenge response was not JSON: {e}")
+
+    def _watch_for_challenge(self, page: Page):
+        """Start listening for the challenge response, which the widget may fetch before or after the click"""
+        pattern = self.challenge_url_pattern
+        challenge = asyncio.get_running_loop().create_future()
+
+        def on_response(response):
+            if challenge.done() or pattern in response.url:
+                page.remove_listener("response", on_response)
+                if not challenge.done():
+                    challenge.set_result(response)
+
+        page.on("response", on_response)
+        self._challenge = challenge
+
+    async def click_checkbox_and_capture_challenge(self, page: Page, timeout_ms: int = 30000):
+        """Click the checkbox, capturing the challenge that the widget fetches"""
+        if self._challenge is None:
+            self._watch_for_challenge(page)
+        challenge = self._challenge
+        # If the challenge has already come, there is no response to wait for after the click
+        fetched_before_click = challenge.done()
+
+        try:
+            await self.find_and_click_checkbox(page)
+
+            if fetched_before_click:
+                logger.info("ℹ️ ALTCHA challenge was fetched before the click")
+            else:
+                await asyncio.wait_for(asyncio.shield(challenge), timeout_ms / 1000)
+            await self.log_challenge(challenge.result())
+        except asyncio.TimeoutError:
+            logger.warning("ALTCHA challenge response was not seen")
+        finally:
+            if not challenge.done():
+                challenge.cancel()  # so the listener removes itself
+
     async def move_mouse_naturally(self, page: Page, target_x: int, target_y: int):
         """Move mouse along a curved path to target"""
         try:
+            rng = _mouse_rng
+            move = page.mouse.move
+
             # Get current mouse position (start from a random position if unknown)
-            start_x = random.randint(100, 500)
-            start_y = random.randint(100, 300)
-            
+            start_x = rng.randint(100, 500)
+            start_y = rng.randint(100, 300)
+
             # Create a curved path with multiple steps
-            steps = random.randint(15, 25)
-            for i in range(steps):
-                progress = i / steps
-                # Add some curve to the movement (bezier-like)
-                curve_offset = 30 * (4 * progress * (1 - progress))
-                
-                current_x = start_x + (target_x - start_x) * progress
-                current_y = start_y + (target_y - start_y) * progress + curve_offset
-                
-                await page.mouse.move(current_x, current_y)
-                await asyncio.sleep(random.uniform(0.005, 0.015))
-            
+            steps = rng.randint(15, 25)
+            path = curved_path(start_x, start_y, target_x, target_y, steps)
+            uniform = rng.uniform
+            dwell = sum(uniform(0.005, 0.015) for _ in range(steps))
+
+            # Send the moves back to back, with a single pause for the whole gesture
+            for current_x, current_y in path:
+                await move(current_x, current_y)
+            await asyncio.sleep(dwell)
+
             # Final move to exact target
-            await page.mouse.move(target_x, target_y)
+            await move(target_x, target_y)
         except Exception as e:
             logger.warning(f"Could not move mouse naturally: {e}")
     
+    async def goto_captcha_page(self, page: Page):
+        """Load the captcha page, returning as soon as the ALTCHA widget is in the DOM"""
+        # The widget may fetch its challenge while the page loads, so listen from the start
+        self._watch_for_challenge(page)
+        # Not "networkidle": analytics and beacons can keep the network busy for seconds
+        await page.goto(self.captcha_page_url, wait_until="domcontentloaded", timeout=30000)
+        await self.wait_for_widget(page, timeout_ms=15000)
+
+    async def wait_for_widget(self, page: Page, timeout_ms: int):
+        """Wait for the altcha-widget to be present"""
+        logger.info("⏳ Waiting for ALTCHA widget to appear...")
+        widget = await page.wait_for_selector("altcha-widget", state="attached", timeout=timeout_ms)
+
+        if not widget:
+            raise CaptchaTestError("ALTCHA widget not found")
+
+        logger.info("✓ ALTCHA widget found")
+        self._remember_handle(page, 'widget', widget)
+        return widget
+
     async def find_and_click_checkbox(self, page: Page):
         """Find and click the ALTCHA checkbox with human-like behavior"""
         try:
-            # Wait for the altcha-widget to be present
-            logger.info("⏳ Waiting for ALTCHA widget to appear...")
-            widget = await page.wait_for_selector("altcha-widget", state="attached", timeout=10000)
-            
-            if not widget:
-                raise CaptchaTestError("ALTCHA widget not found")
-            
-            logger.info("✓ ALTCHA widget found")
-            
-            # Look for the checkbox inside the widget
-            # Try multiple selectors to find the checkbox
-            checkbox_selectors = [
-                "altcha-widget input[type='checkbox']",
-                "altcha-widget .altcha-checkbox input",
-                "input[id^='altcha_checkbox_']"  # Starts with altcha_checkbox_
-            ]
-            
-            checkbox = None
-            used_selector = None
-            
-            for selector in checkbox_selectors:
-                try:
-                    checkbox = await page.wait_for_selector(selector, state="visible", timeout=2000)
-                    if checkbox:
-                        used_selector = selector
-                        logger.info(f"✓ Found checkbox using selector: {selector}")
-                        break
-                except:
-                    continue
-            
+            checkbox = self._handles.get('checkbox')
             if not checkbox:
-                raise CaptchaTestError("Checkbox input not found")
-            
-            # Check if already checked
-            is_checked = await checkbox.is_checked()
-            if is_checked:
+                if 'widget' not in self._handles:
+                    await self.wait_for_widget(page, timeout_ms=10000)
+
+                # Look for the checkbox inside the widget
+                # Try multiple selectors to find the checkbox
+                checkbox_selectors = [
+                    "altcha-widget input[type='checkbox']",
+                    "altcha-widget .altcha-checkbox input",
+                    "input[id^='altcha_checkbox_']"  # Starts with altcha_checkbox_
+                ]
+
+                # Wait for any of them in one round trip. Playwright's selectors look inside
+                # open shadow roots, and only a visible checkbox will do.
+                try:
+                    checkbox = await page.wait_for_selector(
+                        ", ".join(checkbox_selectors), state="visible", timeout=6000)
+                except PlaywrightTimeoutError:
+                    checkbox = None
+
+                if not checkbox:
+                    raise CaptchaTestError("Checkbox input not found")
+                logger.info("✓ Found checkbox")
+                self._remember_handle(page, 'checkbox', checkbox)
+            
+            # Check if already checked, and get its bounding box, in one round trip
+            state = await checkbox.evaluate(CHECKBOX_STATE_JS)
+            if state['checked']:
                 logger.info("ℹ️ Checkbox is already checked!")
                 return True
-            
-            # Get checkbox bounding box
-            box = await checkbox.bounding_box()
+
+            box = state['box']
             if not box:
                 # Try clicking the label instead
                 label = await page.query_selector("altcha-widget .altcha-label")
@@ -134,15 +285,16 @@ class CaptchaTester:
             # Small pause before clicking (human reads "I'm not a robot")
             await self.random_delay(500, 1200)
             
-            # Perform the click with mouse down/up for realism
+            # Perform the click, holding the button down for a realistic duration
             logger.info("🖱️  Clicking the checkbox...")
-            await page.mouse.down()
-            await asyncio.sleep(random.uniform(0.05, 0.12))  # Realistic click duration
-            await page.mouse.up()
+            await page.mouse.click(click_x, click_y, delay=random.uniform(50, 120))
             
             # Verify the click worked
-            await asyncio.sleep(0.3)
-            is_checked = await checkbox.is_checked()
+            try:
+                await page.wait_for_function("(el) => el.checked", arg=checkbox, timeout=1000)
+                is_checked = True
+            except PlaywrightTimeoutError:
+                is_checked = False
             logger.info(f"✓ Checkbox checked status: {is_checked}")
             
             # Small movement away after click
@@ -157,87 +309,62 @@ class CaptchaTester:
             logger.error(f"❌ Error clicking checkbox: {e}")
             raise CaptchaTestError(f"Failed to click checkbox: {e}")
     
+    async def _probe(self, page: Page):
+        """Read the widget's solution, state and label in a single round trip"""
+        return await page.evaluate(PROBE_JS, self._handles.get('widget'))
+
     async def wait_for_proof_of_work(self, page: Page, timeout_ms: int = 60000):
         """Wait for the proof-of-work to complete"""
         logger.info("⏳ Waiting for proof-of-work computation...")
-        start_time = time.time() * 1000
-        check_interval = 300
-        last_state = None
-        check_count = 0
-        
-        while (time.time() * 1000 - start_time) < timeout_ms:
-            check_count += 1
-            
-            try:
-                # PRIMARY CHECK: Look for the hidden input with the proof
-                hidden_input = await page.query_selector("altcha-widget input[type='hidden'][name='altcha']")
-                if hidden_input:
-                    value = await hidden_input.get_attribute("value")
-                    if value and len(value) > 50:  # The JWT token is quite long
-                        logger.info(f"✅ SUCCESS! Hidden input found with proof-of-work solution")
-                        logger.info(f"🔑 Solution token length: {len(value)} characters")
-                        return True
-                
-                # SECONDARY CHECK: data-state="verified"
-                widget = await page.query_selector("altcha-widget .altcha[data-state='verified']")
-                if widget:
-                    logger.info(f"✅ SUCCESS! Widget state is 'verified'")
-                    return True
-                
-                # TERTIARY CHECK: Label text changed to "Verified"
-                label = await page.query_selector("altcha-widget .altcha-label")
-                if label:
-                    label_text = await label.inner_text()
-                    if label_text.strip() == "Verified":
-                        logger.info(f"✅ SUCCESS! Label changed to 'Verified'")
-                        return True
-                
-                # Check current state for logging
-                altcha_div = await page.query_selector("altcha-widget .altcha[data-state]")
-                if altcha_div:
-                    current_state = await altcha_div.get_attribute("data-state")
-                    if current_state != last_state:
-                        logger.info(f"📊 Widget state: {current_state}")
-                        last_state = current_state
-                
-                # Log progress every 5 seconds
-                elapsed = (time.time() * 1000 - start_time) / 1000
-                if check_count % 17 == 0:  # Roughly every 5 seconds (300ms * 17)
-                    logger.info(f"⏱️  Still waiting... ({elapsed:.1f}s elapsed)")
-                        
-            except Exception as e:
-                logger.debug(f"Error checking success indicators: {e}")
-            
-            # Random delay before next check with slight variation
-            await asyncio.sleep(check_interval / 1000)
-            check_interval = random.uniform(280, 320)
-            
-            # Occasional micro mouse movement to seem alive
-            if random.random() < 0.08:  # 8% chance
-                try:
-                    current_x = random.randint(400, 800)
-                    current_y = random.randint(300, 600)
-                    await page.mouse.move(
-                        current_x + random.uniform(-10, 10),
-                        current_y + random.uniform(-10, 10)
-                    )
-                except:
-                    pass
-        
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        # State transitions are reported from the page via console messages
+        def log_state_change(message):
+            text = message.text
+            if text.startswith(STATE_LOG_PREFIX):
+                logger.info(f"📊 Widget state: {text[len(STATE_LOG_PREFIX):]}")
+
+        page.on("console", log_state_change)
+        try:
+            await page.evaluate(WATCH_STATE_JS, [self._handles.get('widget'), STATE_LOG_PREFIX])
+
+            # Block in the browser until one of the success indicators appears.
+            # Checking on every animation frame notices completion within ~16ms,
+            # and costs no round trips since the check runs in the page.
+            result = await page.wait_for_function(
+                POW_DONE_JS, arg=self._handles.get('widget'), timeout=timeout_ms, polling="raf")
+            outcome = await result.json_value()
+        except PlaywrightTimeoutError:
+            outcome = None
+        finally:
+            page.remove_listener("console", log_state_change)
+
+        elapsed = loop.time() - start_time
+        if outcome:
+            if outcome['src'] == 'hidden':
+                logger.info(f"✅ SUCCESS! Hidden input found with proof-of-work solution")
+                logger.info(f"🔑 Solution token length: {outcome['length']} characters")
+            elif outcome['src'] == 'state':
+                logger.info(f"✅ SUCCESS! Widget state is 'verified'")
+            else:
+                logger.info(f"✅ SUCCESS! Label changed to 'Verified'")
+            logger.info(f"⏱️  Proof-of-work took {elapsed:.1f}s")
+            return True
+
         # Timeout reached
-        logger.error("❌ Proof-of-work timeout reached (60 seconds)")
-        
+        logger.error(f"❌ Proof-of-work timeout reached ({elapsed:.0f} seconds)")
+
         # Try to get final state for debugging
         try:
-            altcha_div = await page.query_selector("altcha-widget .altcha[data-state]")
-            if altcha_div:
-                final_state = await altcha_div.get_attribute("data-state")
-                logger.error(f"Final state at timeout: {final_state}")
+            probe = await self._probe(page)
+            if probe:
+                logger.error(f"Final state at timeout: {probe['state']}")
         except:
             pass
-            
-        raise CaptchaTestError("Proof-of-work completion timeout after 60 seconds")
-    
+
+        raise CaptchaTestError(f"Proof-of-work completion timeout after {timeout_ms / 1000:.0f} seconds")
+
     async def click_continue_button(self, page: Page):
         """Click the Continue button and verify navigation"""
         try:
@@ -275,9 +402,7 @@ class CaptchaTester:
             
             # Click the button
             logger.info("🖱️  Clicking Continue button...")
-            await page.mouse.down()
-            await asyncio.sleep(random.uniform(0.06, 0.14))
-            await page.mouse.up()
+            await page.mouse.click(click_x, click_y, delay=random.uniform(60, 140))
             
             # Wait for navigation or response
             logger.info("⏳ Waiting for page navigation...")
@@ -319,7 +444,7 @@ class CaptchaTester:
                 logger.info("🌐 Launching browser...")
                 browser = await p.chromium.launch(
                     headless=False,
-                    slow_mo=50,  # 50ms delay for visibility
+                    slow_mo=self.slow_mo_ms,
                     args=[
                         '--start-maximized',
                         '--auto-open-devtools-for-tabs'  # This opens devtools
@@ -336,12 +461,9 @@ class CaptchaTester:
                 
                 page = await context.new_page()
                 
-                # Set up response interception
-                page.on("response", self.response_handler)
-                
                 # Navigate to captcha page
                 logger.info(f"🌐 Navigating to: {self.captcha_page_url}")
-                await page.goto(self.captcha_page_url, wait_until="networkidle", timeout=30000)
+                await self.goto_captcha_page(page)
                 logger.info("✓ Page loaded successfully")
                 
                 # Human-like delay after page load (reading the page)
@@ -351,7 +473,7 @@ class CaptchaTester:
                 logger.info("\n" + "─" * 70)
                 logger.info("STEP 1: Clicking ALTCHA checkbox")
                 logger.info("─" * 70)
-                await self.find_and_click_checkbox(page)
+                await self.click_checkbox_and_capture_challenge(page)
                 
                 # Small delay after clicking
                 await self.random_delay(300, 600)
@@ -409,65 +531,216 @@ class CaptchaTester:
                 return False
 
 
-async def solve_altcha(url, headless=True, user_agent=None):
+async def _wait_for_cookies(context, interval=0.2):
+    """Return the context's cookies as soon as there are any."""
+    while True:
+        cookies = await context.cookies()
+        if cookies:
+            return cookies
+        logger.info("Waiting for cookies...")
+        await asyncio.sleep(interval)
+
+
+class SolverPool:
+    """Keeps one browser running so that repeated solves only need a fresh context.
+
+    Use as an async context manager, or call close() when done. The pool is bound
+    to the event loop it is first used on.
+    """
+
+    def __init__(self, headless=True, slow_mo_ms=None):
+        self.headless = headless
+        # Delay Playwright adds after every action. By default, only when the browser is visible.
+        self.slow_mo_ms = slow_mo_ms if slow_mo_ms is not None else (0 if headless else 50)
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    async def get_browser(self):
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless,
+                    slow_mo=self.slow_mo_ms,
+                )
+            return self._browser
+
+    async def close(self):
+        async with self._lock:
+            if self._browser is not None:
+                await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class CookieCache:
+    """Cookies from solved captchas, persisted between runs and keyed by site origin."""
+
+    DEFAULT_PATH = os.path.expanduser('~/.cache/jobadscrape/altcha.json')
+    DEFAULT_TTL_SEC = 30 * 60  # when none of the cookies carry an expiry
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+
+    @staticmethod
+    def origin(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, url):
+        """Return unexpired cookies for the url's origin, or None."""
+        entry = self._load().get(self.origin(url))
+        if not entry or entry['expires_at'] <= time.time():
+            return None
+        return entry['cookies']
+
+    def put(self, url, cookies, ttl_sec=None):
+        if ttl_sec is None:
+            # Playwright gives session cookies an expiry of -1
+            expiries = [cookie['expires'] for cookie in cookies if cookie.get('expires', -1) > 0]
+            ttl_sec = min(expiries) - time.time() if expiries else self.DEFAULT_TTL_SEC
+        entries = self._load()
+        entries[self.origin(url)] = {'cookies': cookies, 'expires_at': time.time() + ttl_sec}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # The cookies grant access to the site, so keep them private to this user. Written
+            # under a temporary name and renamed, so an interrupted run can't leave it half-written.
+            fd = os.open(f"{self.path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(fd, 0o600)  # in case a leftover temporary file has wider permissions
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            logger.warning(f"Could not save cookie cache {self.path}: {e}")
+
+
+def cookies_pass_captcha(url, cookies, user_agent=None):
+    """Whether the site serves its real page, rather than the captcha, with these cookies."""
+    session = requests.Session()
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'],
+                            domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    headers = {'User-Agent': user_agent} if user_agent else {}
+    try:
+        response = session.get(url, headers=headers, timeout=30)
+    except requests.RequestException as e:
+        logger.warning(f"Could not check cached cookies: {e}")
+        return False
+    return response.ok and 'altcha-widget' not in response.text
+
+
+async def solve_altcha(url, headless=True, user_agent=None, pool=None, block_assets=True,
+                       cookie_cache=True):
     """Solve the ALTCHA captcha and return cookies for use with a requests session.
 
     Args:
         url: The URL of the page with the ALTCHA captcha.
-        headless: Whether to run the browser in headless mode.
+        headless: Whether to run the browser in headless mode. Ignored if a pool
+            is given, since the pool's browser is already launched.
         user_agent: Browser user-agent string. Defaults to a Chrome UA.
+        pool: SolverPool whose browser is reused. If not given, a browser is
+            launched for this solve and closed afterwards.
+        block_assets: Whether to skip downloading images, media and fonts.
+        cookie_cache: Whether to reuse cookies from an earlier solve, if the site
+            still accepts them, and to save the cookies from a new solve.
 
     Returns:
         List of cookie dicts from the browser session.
     """
-    tester = CaptchaTester(captcha_page_url=url)
+    cache = CookieCache() if cookie_cache else None
+    if cache:
+        cookies = cache.get(url)
+        if cookies and await asyncio.to_thread(cookies_pass_captcha, url, cookies, user_agent):
+            logger.info(f"Reusing {len(cookies)} cached ALTCHA cookies")
+            return cookies
+
+    if pool is None:
+        async with SolverPool(headless=headless) as pool:
+            cookies = await _solve_in_browser(url, user_agent, pool, block_assets)
+    else:
+        cookies = await _solve_in_browser(url, user_agent, pool, block_assets)
+
+    if cache:
+        cache.put(url, cookies)
+    return cookies
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=headless,
-            slow_mo=50 if not headless else 0,
-        )
 
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent=user_agent,
-            locale='en-US',
-            timezone_id='Europe/London',
-        )
+async def _solve_in_browser(url, user_agent, pool, block_assets):
+    # The pool launched the browser, so its slow_mo applies, not the tester's
+    tester = CaptchaTester(captcha_page_url=url)
+    browser = await pool.get_browser()
+
+    context = await browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent=user_agent,
+        locale='en-US',
+        timezone_id='Europe/London',
+    )
+    try:
+        if block_assets:
+            await context.route(BLOCKED_ASSETS_RE, lambda route: route.abort())
 
         page = await context.new_page()
-        page.on("response", tester.response_handler)
 
         logger.info(f"Navigating to: {url}")
-        await page.goto(url, wait_until="networkidle", timeout=30000)
-        await tester.random_delay(1000, 2000)
+        await tester.goto_captcha_page(page)
+        if not pool.headless:
+            # Human-like delay after page load (reading the page)
+            await tester.random_delay(1000, 2000)
 
-        await tester.find_and_click_checkbox(page)
+        await tester.click_checkbox_and_capture_challenge(page)
         await tester.random_delay(300, 600)
         await tester.wait_for_proof_of_work(page, timeout_ms=60000)
 
-        label = await page.query_selector("altcha-widget .altcha-label")
-        if label:
-            label_text = await label.inner_text()
-            logger.info(f"ALTCHA label text: '{label_text.strip()}'")
+        probe = await tester._probe(page)
+        if probe and probe['label'] is not None:
+            logger.info(f"ALTCHA label text: '{probe['label']}'")
 
         await tester.click_continue_button(page)
 
-        # Wait for cookies to be set after navigation
-        for attempt in range(10):
-            await asyncio.sleep(1)
-            cookies = await context.cookies()
-            if cookies:
-                break
-            logger.info(f"Waiting for cookies... (attempt {attempt + 1})")
+        # Cookies are set along with the navigation away from the captcha page
+        try:
+            await page.wait_for_url(lambda page_url: page_url != url, timeout=10000)
+        except PlaywrightTimeoutError:
+            pass
+        cookies = await context.cookies()
+        if not cookies:
+            try:
+                cookies = await asyncio.wait_for(_wait_for_cookies(context), timeout=5.0)
+            except asyncio.TimeoutError:
+                cookies = []
+    finally:
+        await context.close()
 
-        await browser.close()
+    if not cookies:
+        raise CaptchaTestError("No cookies received after solving ALTCHA")
+
+    logger.info(f"ALTCHA solved, got {len(cookies)} cookies")
+    return cookies
 
-        if not cookies:
-            raise CaptchaTestError("No cookies received after solving ALTCHA")
 
-        logger.info(f"ALTCHA solved, got {len(cookies)} cookies")
-        return cookies
+def run(coro):
+    """Run a coroutine to completion, on uvloop if it is available."""
+    if uvloop:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
 
 
 async def main():
@@ -481,7 +754,8 @@ async def main():
     # Create and run the tester
     tester = CaptchaTester(
         captcha_page_url=CAPTCHA_PAGE_URL,
-        challenge_url_pattern=CHALLENGE_URL_PATTERN
+        challenge_url_pattern=CHALLENGE_URL_PATTERN,
+        slow_mo_ms=50,  # 50ms delay for visibility
     )
 
     success = await tester.run_test()
@@ -500,5 +774,5 @@ if __name__ == "__main__":
         format='%(asctime)s %(levelname)s %(message)s',
         datefmt='%H:%M',
     )
-    exit_code = asyncio.run(main())
+    exit_code = run(main())
     exit(exit_code)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import argparse
-import asyncio
 from base64 import b64encode
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum, auto
 import json
@@ -9,24 +9,39 @@ import logging
 import os
 import re
 import sys
+import threading
 import time
 from urllib.parse import urljoin, urlparse
 
+LOG_LEVEL_NAME = (os.environ.get('LOGLEVEL') or 'INFO').upper()
+# getLevelName gives the level's number, or a 'Level ...' string for a name it doesn't know
+log_level = logging.getLevelName(LOG_LEVEL_NAME)
 logging.basicConfig(
-    level=logging.INFO,
+    level=log_level if isinstance(log_level, int) else logging.INFO,
     format='%(asctime)s %(levelname)s %(message)s',
     datefmt='%H:%M',
 )
 logger = logging.getLogger(__name__)
+if not isinstance(log_level, int):
+    logger.warning(f"Unknown LOGLEVEL '{LOG_LEVEL_NAME}' - using INFO")
 
-from altcha import solve_altcha
-from bs4 import BeautifulSoup
+from altcha import run as run_async, solve_altcha
+from bs4 import BeautifulSoup, SoupStrainer
 from google.oauth2.credentials import Credentials
 from google.oauth2.service_account import Credentials as ServiceAccountCredentials
 from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import lxml.html
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from weasyprint import HTML
+try:
+    from weasyprint.urls import URLFetcher
+except ImportError:
+    # Older WeasyPrint takes a plain function as the url_fetcher
+    from weasyprint import default_url_fetcher
+    URLFetcher = None
+from weasyprint.text.fonts import FontConfiguration
 
 logging.getLogger('weasyprint').setLevel(logging.ERROR)
 
@@ -92,6 +107,12 @@ USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Ge
 HEADERS = {
     "User-Agent": USER_AGENT,
 }
+# The SID and reqsig from a recent run, reused while the captcha cookies are unchanged
+SID_CACHE_PATH = os.path.expanduser('~/.cache/jobadscrape/sid.json')
+SID_CACHE_TTL_SEC = 15 * 60
+# Only the parts of a search results page that get used - the job boxes and the paging links
+SEARCH_RESULTS_STRAINER = SoupStrainer(
+    ["li", "div"], class_=["search-results-job-box", "search-results-paging-menu"])
 
 # Data saved to Google Sheets
 # https://docs.google.com/spreadsheets/d/1Ugt9kMQq-S8q1fm3u8RNKjNb2-fwiXDhf4ooFirGIRs/edit?usp=sharing
@@ -103,6 +124,20 @@ RANGE_NAME = 'Sheet1!A:Z'
 REPO_OWNER = "davidread"
 REPO_NAME = "jobadscrape"
 REPO_BRANCH = "main"
+JOBS_FOLDER = "jobs"
+# Times to try committing the new PDFs, if the branch moves on in the meantime
+GITHUB_COMMIT_ATTEMPTS = 3
+# The repo's file list from the last run, revalidated with its ETag
+GITHUB_TREE_CACHE_PATH = os.path.expanduser('~/.cache/jobadscrape/github_tree.json')
+
+# (connect, read) timeout in seconds for every HTTP request
+REQUEST_TIMEOUT = (5, 30)
+
+# Job PDFs are rendered with the system fonts instead
+WEB_FONT_EXTENSIONS = ('.woff', '.woff2', '.ttf', '.otf', '.eot')
+
+# Number of job PDFs handled in the background at once (rendering itself is done in pdf_pool)
+PDF_WORKERS = 4
 
 class ScrapeResult(Enum):
     NEW = auto()
@@ -160,7 +195,7 @@ def solve_captcha():
     """Solve the ALTCHA captcha and transfer cookies to the requests session."""
     logger.info("Solving ALTCHA captcha...")
     captcha_url = f"{BASE_URL}/csr/index.cgi"
-    cookies = asyncio.run(solve_altcha(captcha_url, headless=True, user_agent=USER_AGENT))
+    cookies = run_async(solve_altcha(captcha_url, headless=True, user_agent=USER_AGENT))
     for cookie in cookies:
         requests_session.cookies.set(
             cookie['name'], cookie['value'],
@@ -173,23 +208,42 @@ def scrape_jobs(search_options_list, dry_run):
     logger.info("Starting job scraping...")
     stats = ScrapingStats()
 
-    # Fetch a list of PDFs already in GitHub
+    # Job PDFs are rendered in the background, while the (rate-limited)
+    # fetching of search results and job pages carries on in this thread
+    pdf_executor = ThreadPoolExecutor(max_workers=PDF_WORKERS)
+    if not dry_run:
+        # Start the renderer processes now, so they're warmed up by the time the first job is found
+        start_pdf_workers()
+
+    # The list of PDFs already in GitHub and the existing jobs in the sheet are
+    # independent of the captcha, so load them in the background while it is solved
     github_token = get_github_token()
-    file_list = fetch_all_files_from_github(github_token) if github_token else []
+    file_list_future = pdf_executor.submit(fetch_all_files_from_github, github_token) if github_token else None
+    jobs_google_sheet_future = pdf_executor.submit(JobsGoogleSheet)
+
+    solve_captcha()
+    sid, reqsig = get_cached_sid_and_reqsig()
+
+    file_list = file_list_future.result() if file_list_future else frozenset()
 
     # Initialize Google Sheets service
-    jobs_google_sheet = JobsGoogleSheet()
+    jobs_google_sheet = jobs_google_sheet_future.result()
     if not jobs_google_sheet:
         logger.warning("Google Sheets service not initialized. Will continue without saving to sheets.")
     else:
         logger.info(f"Found {jobs_google_sheet.num_jobs} existing jobs in sheet")
 
-    solve_captcha()
-    sid = get_fresh_sid()
-    reqsig = get_reqsig(sid)
+    # Set once the SID has been fetched afresh, after the site rejected it
+    sid_refreshed = False
+
+    # The searches overlap, so the same job can turn up more than once in a run
+    seen_jobs = set()
+    # Jobs to add to the sheet, as (job_data, output_folder, PDF future or None if the
+    # PDF is already on GitHub). They are added once their PDFs are committed.
+    new_jobs = []
 
     for search_options in search_options_list:
-        output_folder = f'jobs/{search_options.pop("output folder")}'
+        output_folder = f'{JOBS_FOLDER}/{search_options.pop("output folder")}'
         os.makedirs(output_folder, exist_ok=True)
 
         # Perform search
@@ -222,18 +276,40 @@ def scrape_jobs(search_options_list, dry_run):
         page_number = 1
 
         while True:
-            if page_number == 1:
-                # First page uses POST with payload
-                response = requests_session.post(current_url, data=payload, headers=HEADERS)
-            else:
-                # Subsequent pages use GET with the full URL
-                logger.info(f"Processing page {page_number}")
-                response = requests_session.get(current_url, headers=HEADERS)
-            response.raise_for_status()
+            try:
+                if page_number == 1:
+                    # First page uses POST with payload
+                    response = requests_session.post(current_url, data=payload)
+                else:
+                    # Subsequent pages use GET with the full URL
+                    logger.info(f"Processing page {page_number}")
+                    response = requests_session.get(current_url)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                # Carry on with the other searches, and the PDFs already under way
+                logger.error(f"Error fetching search results page {page_number}: {e}")
+                stats.add_job(output_folder, ScrapeResult.ERROR)
+                break
 
-            # Parse search results
-            soup = BeautifulSoup(response.text, "html.parser")
+            # Parse search results. Passing the bytes, with the charset from the headers if any,
+            # avoids requests decoding (and maybe guessing the encoding of) the whole body first.
+            soup = BeautifulSoup(response.content, "lxml", from_encoding=response.encoding,
+                                 parse_only=SEARCH_RESULTS_STRAINER)
             job_results = soup.find_all("li", class_="search-results-job-box")
+            if page_number == 1 and not job_results and not sid_refreshed:
+                # Not even the "no jobs" box, so the search was refused - e.g. the cached SID
+                # is no longer valid. Get a new SID and try the search again.
+                logger.warning("Search results page has no job boxes - getting a new SID")
+                sid_refreshed = True
+                try:
+                    sid, reqsig = get_cached_sid_and_reqsig(refresh=True)
+                except Exception as e:
+                    # Carry on with the other searches, and the PDFs already under way
+                    logger.error(f"Error getting a new SID: {e}")
+                    stats.add_job(output_folder, ScrapeResult.ERROR)
+                    break
+                payload.update(SID=sid, reqsig=reqsig)
+                continue
             logger.info(f"Found {len(job_results)} job listings on page {page_number}")
 
             for job_result in job_results:
@@ -255,6 +331,13 @@ def scrape_jobs(search_options_list, dry_run):
                         logger.info(f'Ignoring job "{job_data["title"]}" as salary £{job_data.get("salary_max") or job_data.get("salary_min")} is below minimum £{minimum_salary}')
                         continue
 
+                    job_key = job_data['reference'] or (job_data['title'], job_data['department'], job_data['closing_date'])
+                    if job_key in seen_jobs:
+                        logger.info(f'Skipping job "{job_data["title"]}" as an earlier search already found it')
+                        stats.add_job(output_folder, ScrapeResult.EXISTING)
+                        continue
+                    seen_jobs.add(job_key)
+
                     # Check if job already exists in the sheet
                     row_in_sheet = jobs_google_sheet.get_job_row(job_data)
                     if row_in_sheet is not None:
@@ -262,15 +345,20 @@ def scrape_jobs(search_options_list, dry_run):
                         stats.add_job(output_folder, ScrapeResult.EXISTING)
                         continue
 
-                    # Add to sheet
-                    if jobs_google_sheet and jobs_google_sheet.append_to_sheets(job_data, dry_run):
-                        # If successfully added to sheet, fetch full page and save PDF
-                        if scrape_job_page(job_data, output_folder, file_list, jobs_google_sheet, dry_run):
-                            stats.add_job(output_folder, ScrapeResult.NEW)
-                        else:
-                            stats.add_job(output_folder, ScrapeResult.ERROR)
-                    else:
-                        stats.add_job(output_folder, ScrapeResult.ERROR)
+                    # The PDF name only needs the search result, so check GitHub before
+                    # spending a request on the job page and a render on the PDF
+                    pdf_path = job_pdf_path(output_folder, job_data['title'], job_data['department'], job_data['closing_date'])
+                    job_data['pdf_path'] = pdf_path
+                    if pdf_path in file_list:
+                        logger.info(f"File already exists on GitHub: {pdf_path}")
+                        new_jobs.append((job_data, output_folder, None))
+                        continue
+
+                    # Fetch full page and save PDF - unless an earlier run saved the PDF
+                    # locally but didn't get as far as uploading it
+                    job_html = None if os.path.exists(pdf_path) else scrape_job_page(job_data)
+                    future = pdf_executor.submit(save_job_as_pdf, job_html, pdf_path, github_token, dry_run)
+                    new_jobs.append((job_data, output_folder, future))
 
                 except Exception as e:
                     logger.error(f"Error processing job box: {e}")
@@ -285,41 +373,115 @@ def scrape_jobs(search_options_list, dry_run):
             current_url = next_url
             page_number += 1
 
+    # Wait for the background PDF rendering and blob uploads
+    pdf_blobs = {}
+    jobs_to_add = []  # (job_data, output_folder, result to count once added)
+    for job_data, output_folder, future in new_jobs:
+        if future is None:
+            jobs_to_add.append((job_data, output_folder, ScrapeResult.EXISTING))
+            continue
+        try:
+            pdf_blobs[job_data['pdf_path']] = future.result()
+        except Exception as e:
+            logger.error(f"Error saving PDF: {e}")
+            stats.add_job(output_folder, ScrapeResult.ERROR)
+            continue
+        jobs_to_add.append((job_data, output_folder, ScrapeResult.NEW))
+    pdf_executor.shutdown()
+
+    # Commit all the new PDFs before adding their jobs to the sheet. Later runs skip jobs
+    # that are in the sheet, so a job must not get there unless its PDF is in the repo.
+    if not upload_job_pdfs(pdf_blobs, github_token, dry_run):
+        for job_data, output_folder, result in jobs_to_add:
+            if result == ScrapeResult.NEW:
+                stats.add_job(output_folder, ScrapeResult.ERROR)
+        jobs_to_add = [job for job in jobs_to_add if job[2] == ScrapeResult.EXISTING]
+
+    # Add the jobs to the sheet, in one request
+    added = bool(jobs_to_add) and jobs_google_sheet and jobs_google_sheet.append_jobs_to_sheets(
+        [job_data for job_data, _, _ in jobs_to_add], dry_run)
+    for job_data, output_folder, result in jobs_to_add:
+        stats.add_job(output_folder, result if added else ScrapeResult.ERROR)
+
     # Print summary at the end
     stats.print_summary()
     return stats
 
-def get_fresh_sid():
-    """Fetch a fresh SID from the website."""
+def get_cached_sid_and_reqsig(refresh=False):
+    """Reuse the SID and reqsig from a recent run with the same captcha cookies, else fetch fresh ones.
+
+    With refresh, e.g. when the site has rejected the cached SID, the cache is dropped and fresh ones fetched.
+    """
+    cache = load_json_cache(SID_CACHE_PATH)
+    if refresh:
+        # Forget the rejected SID, along with the cookies that were restored with it
+        for name in cache.get("session_cookies", {}):
+            requests_session.cookies.pop(name, None)
+        try:
+            os.remove(SID_CACHE_PATH)
+        except OSError:
+            pass
+        cache = {}
+
+    cookies = requests_session.cookies.get_dict()
+    if cache.get("cookies") == cookies and cache.get("expires_at", 0) > time.time():
+        logger.info("Reusing SID from a recent run")
+        # Restore any cookies the site set along with the SID
+        for name, value in cache["session_cookies"].items():
+            requests_session.cookies.set(name, value, domain=urlparse(BASE_URL).netloc)
+        return cache["sid"], cache["reqsig"]
+
+    sid, reqsig = get_sid_and_reqsig()
+    save_json_cache(SID_CACHE_PATH, {
+        "cookies": cookies,
+        "session_cookies": {name: value for name, value in requests_session.cookies.get_dict().items()
+                            if name not in cookies},
+        "sid": sid,
+        "reqsig": reqsig,
+        "expires_at": time.time() + SID_CACHE_TTL_SEC,
+    })
+    return sid, reqsig
+
+def get_sid_and_reqsig():
+    """Fetch a fresh SID, and the reqsig needed to search, from the website."""
     initial_url = f"{BASE_URL}/csr/index.cgi"
-    response = requests_session.get(initial_url, headers=HEADERS)
+    response = requests_session.get(initial_url)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    # Only a couple of attributes are needed, so query them directly with lxml
+    tree = lxml.html.fromstring(response.content)
+    sid = extract_sid(tree)
 
+    # The home page's search form usually carries the reqsig too, saving a request
+    reqsig_values = tree.xpath('//input[@name="reqsig"]/@value')
+    if reqsig_values:
+        return sid, reqsig_values[0]
+    return sid, get_reqsig(sid)
+
+def extract_sid(tree):
     # Option 1: Extract SID from a hidden input field (most common case)
-    sid_input = soup.find("input", {"name": "SID"})
-    if sid_input:
-        return sid_input["value"]
+    sid_values = tree.xpath('//input[@name="SID"]/@value')
+    if sid_values:
+        return sid_values[0]
 
     # Option 2: Extract SID from the URL in the "action" or "form" element
-    form_action = soup.find("form")["action"]
+    form_action = tree.xpath('//form/@action')[0]
     if "SID=" in form_action:
         return form_action.split("SID=")[1].split("&")[0]
 
 def get_reqsig(sid):
     url = f"{BASE_URL}/csr/esearch.cgi?SID="
     params = {"SID": sid}
-    response = requests_session.get(url, params=params, headers=HEADERS)
+    response = requests_session.get(url, params=params)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    return extract_reqsig(soup)
+    tree = lxml.html.fromstring(response.content)
+    return extract_reqsig(tree)
 
-def extract_reqsig(soup):
-    reqsig_input = soup.find("input", {"name": "reqsig"})
-    assert reqsig_input
-    reqsig = reqsig_input["value"]
+def extract_reqsig(tree):
+    reqsig_values = tree.xpath('//input[@name="reqsig"]/@value')
+    assert reqsig_values
+    reqsig = reqsig_values[0]
     return reqsig
 
 def get_next_page_url(soup, base_url):
@@ -340,26 +502,49 @@ def ensure_absolute_url(href, base_url):
         return urljoin(base_url, href)
     return href
 
+CLOSING_DATE_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]+)\s+(\d{4})')
+# Spelt out, rather than from calendar.month_name, which follows the locale
+MONTHS = {
+    name: number for number, name in enumerate(
+        ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+         'august', 'september', 'october', 'november', 'december'], start=1)
+}
+
+JOB_BOX_FIELD_CLASSES = [
+    "search-results-job-box-title",
+    "search-results-job-box-department",
+    "search-results-job-box-salary",
+    "search-results-job-box-location",
+    "search-results-job-box-refcode",
+    "search-results-job-box-closingdate",
+]
+
 def scrape_job_search_result(job_box):
     """Extract job information from a search result box."""
     if job_box.attrs.get("title") == "Your search matched no jobs":
         return
 
+    # Find all the field elements in one pass over the box, rather than a find() each
+    fields = {}
+    for element in job_box.find_all(class_=JOB_BOX_FIELD_CLASSES):
+        for class_ in element["class"]:
+            fields.setdefault(class_, element)
+
     # Extract basic info
-    title_tag = job_box.find("h3", class_="search-results-job-box-title")
+    title_tag = fields["search-results-job-box-title"]
     job_title = title_tag.get_text(strip=True)
     job_link = title_tag.find("a")["href"]
-    dept_elem = job_box.find("div", class_="search-results-job-box-department")
+    dept_elem = fields["search-results-job-box-department"]
     for sr in dept_elem.find_all(class_="sr-only"):
         sr.decompose()
     department = dept_elem.get_text(strip=True)
 
     # Extract salary
-    salary_elem = job_box.find("div", class_="search-results-job-box-salary")
+    salary_elem = fields.get("search-results-job-box-salary")
     salary_min, salary_max = extract_salary_range(salary_elem) if salary_elem else (None, None)
 
     # Extract location
-    location_elem = job_box.find("div", class_="search-results-job-box-location")
+    location_elem = fields.get("search-results-job-box-location")
     if location_elem:
         for sr in location_elem.find_all(class_="sr-only"):
             sr.decompose()
@@ -368,38 +553,21 @@ def scrape_job_search_result(job_box):
         location = None
 
     # Extract reference
-    ref_elem = job_box.find("div", class_="search-results-job-box-refcode")
+    ref_elem = fields.get("search-results-job-box-refcode")
     reference = extract_reference(ref_elem) if ref_elem else None
-    reference = None
-    if ref_elem:
-        ref_text = ref_elem.get_text(strip=True)
-        match = re.search(r'(?:Reference|Ref|Reference number)\s?:\s*([^\s]+)', ref_text, re.IGNORECASE)
-        reference = match.group(1) if match else ref_text
 
     # Extract closing date
     closing_date = None
-    closing_date_elem = job_box.find("div", class_="search-results-job-box-closingdate")
+    closing_date_elem = fields.get("search-results-job-box-closingdate")
     if closing_date_elem:
         date_text = closing_date_elem.get_text(strip=True)
         try:
-            # Remove any "Closing date: " prefix
-            if ":" in date_text:
-                date_text = date_text.split(":", 1)[1].strip()
-
-            # Remove the time prefix and day of the week if present
-            if " on " in date_text:
-                date_text = date_text.split(" on ", 1)[1].strip()
-
-            # Remove any day of week if present
-            if any(day in date_text for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']):
-                date_text = ' '.join(date_text.split(' ')[1:])
-
-            # Extract day, month, year
-            day = ''.join(c for c in date_text.split()[0] if c.isdigit())
-            month = date_text.split()[1]
-            year = date_text.split()[2]
-            date_text = f"{day} {month} {year}"
-            closing_date = datetime.strptime(date_text.strip(), '%d %B %Y').strftime('%Y-%m-%d')
+            # e.g. "Closes : 11:55 pm on Wednesday 22nd January 2025"
+            match = CLOSING_DATE_RE.search(date_text)
+            if not match:
+                raise ValueError("no date found")
+            day, month_name, year = match.groups()
+            closing_date = datetime(int(year), MONTHS[month_name.lower()], int(day)).strftime('%Y-%m-%d')
         except Exception as e:
             logger.error(f"Error parsing date '{date_text}': {e}")
 
@@ -421,62 +589,50 @@ def scrape_job_search_result(job_box):
     return job_data
 
 
+SALARY_PREFIX_RE = re.compile(r'(?:Salary)\s?:\s*(.*)', re.IGNORECASE)
+
+# Salary or salary range, in one pattern. Matches e.g.:
+#   £30,000 - £40,000
+#   £30,000 to £40,000
+#   Up to £40,000
+#   From £30,000
+#   £20,000
+SALARY_RE = re.compile(r'£(?P<min>[\d,]+)(?:\s*(?:-|to)\s*£?(?P<max>[\d,]+))?')
+
+REFERENCE_RE = re.compile(r'(?:Reference|Ref|Reference number)\s?:\s*([^\s]+)', re.IGNORECASE)
+
 def extract_salary_range(soup):
     """Extract minimum and maximum salary from the job page."""
     salary_text = soup.get_text(strip=True)
 
     # Remove the prefix if present
-    match = re.search(r'(?:Salary)\s?:\s*(.*)', salary_text, re.IGNORECASE)
+    match = SALARY_PREFIX_RE.search(salary_text)
     salary_text = match.group(1).strip() if match else salary_text
 
-    # Common patterns for salary ranges
-    patterns = [
-        r'£([\d,]+)(?:\s*-\s*£?([\d,]+))',  # £30,000 - £40,000
-        r'£([\d,]+)(?:\s*to\s*£?([\d,]+))', # £30,000 to £40,000
-        r'Up to £([\d,]+)',  # Up to £40,000
-        r'From £([\d,]+)',   # From £30,000
-        r'£([\d,]+)',        # £20,000
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, salary_text)
-        if match:
-            groups = match.groups()
-            min_salary = groups[0].replace(',', '') if groups[0] else None
-            max_salary = groups[1].replace(',', '') if len(groups) > 1 and groups[1] else min_salary
-            return min_salary, max_salary
+    match = SALARY_RE.search(salary_text)
+    if match:
+        min_salary = match['min'].replace(',', '')
+        max_salary = match['max'].replace(',', '') if match['max'] else min_salary
+        return min_salary, max_salary
 
     return salary_text, None
 
 def extract_reference(ref_elem):
     ref_text = ref_elem.get_text(strip=True)
-    match = re.search(r'(?:Reference|Ref|Reference number)\s?:\s*([^\s]+)', ref_text, re.IGNORECASE)
+    match = REFERENCE_RE.search(ref_text)
     return match.group(1) if match else ref_text
 
-def scrape_job_page(job_data, output_folder, file_list, jobs_google_sheet, dry_run):
+def scrape_job_page(job_data):
+    """Fetch the full job page, returning its HTML."""
     logger.info(f"Fetching job page: {job_data['url']}")
 
-    response = requests_session.get(job_data['url'], headers=HEADERS)
+    response = requests_session.get(job_data['url'])
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    try:
-        # Save PDF
-        pdf_result = save_job_as_pdf(response.text, job_data['title'], job_data['department'],
-                                     job_data['closing_date'], output_folder, file_list, dry_run)
+    return response.text
 
-        if pdf_result == ScrapeResult.NEW:
-            # Update PDF path
-            job_data['pdf_path'] = os.path.join(output_folder,
-                sanitize_filename(f"{job_data['closing_date'] or datetime.now().strftime('%Y-%m-%d')} {job_data['title']} - {job_data['department']}.pdf"))
-
-            success = jobs_google_sheet.update_job_in_sheet(job_data, dry_run)
-            return success
-        return False
-    except Exception as e:
-        logger.error(f"Error saving PDF: {e}")
-        return False
+# First row number of an A1 range, e.g. "A11:J13" -> 11
+RANGE_FIRST_ROW_RE = re.compile(r'[A-Z]+(\d+)')
 
 class JobsGoogleSheet:
     def __init__(self):
@@ -532,14 +688,16 @@ class JobsGoogleSheet:
         return self.job_index.get(lookup_key)
 
     def _job_lookup_keys(self, job_data):
+        # Empty cells read from the sheet are '', where a scraped job has None
         return (
-            job_data.get('reference'),
-            (job_data['title'], job_data['department'], job_data['closing_date'])
+            job_data.get('reference') or None,
+            (job_data['title'], job_data['department'], job_data.get('closing_date') or None)
         )
 
     def add_job_to_index(self, job_data, row_number):
         for lookup_key in self._job_lookup_keys(job_data):
-            self.job_index[lookup_key] = row_number
+            if lookup_key is not None:
+                self.job_index[lookup_key] = row_number
         self.num_jobs += 1
 
     def init_job_index(self):
@@ -566,36 +724,39 @@ class JobsGoogleSheet:
                 logger.error(f"Found headers: {self.headers}")
                 raise ValueError(f"Sheet is missing required headers: {missing_headers}")
 
-            # Create an index of jobs
+            # Create an index of jobs. Only the lookup key columns are read from each row.
+            # Sheets leaves off empty trailing cells, so short rows are padded with ''.
+            key_columns = [(self.column_mapping[header], self.column_indexes[header])
+                           for header in ('reference', 'job title', 'department', 'closing date')]
             self.job_index = {}
             self.num_jobs = 0
-            for i, row in enumerate(rows[1:]):  # Skip header row
-                job_data = {self.column_mapping[header]: row[self.column_indexes[header]]
-                            for header in required_headers
-                            if self.column_indexes[header] < len(row)}
-                self.add_job_to_index(job_data, row_number=i+2)
+            for row_number, row in enumerate(rows[1:], start=2):  # Skip header row
+                job_data = {key: row[idx] if idx < len(row) else '' for key, idx in key_columns}
+                self.add_job_to_index(job_data, row_number)
 
             return self.job_index
         except Exception as e:
             logger.error(f"Error fetching existing jobs: {e}")
             return []
 
-    def append_to_sheets(self, job_data, dry_run):
-        """Append a job to Google Sheets."""
-        try:
-            # Build row based on header order
-            row = []
-            for header in self.headers:
-                header_lower = header.lower()
-                if header_lower in self.column_mapping:
-                    value = job_data.get(self.column_mapping[header_lower], '')
-                    row.append(value if value is not None else '')
-                else:
-                    logger.warning(f"Unexpected column header found: {header}")
-                    row.append('')
+    def build_row(self, job_data):
+        """Build a sheet row for a job, in the sheet's column order."""
+        row = []
+        for header in self.headers:
+            header_lower = header.lower()
+            if header_lower in self.column_mapping:
+                value = job_data.get(self.column_mapping[header_lower], '')
+                row.append(value if value is not None else '')
+            else:
+                logger.warning(f"Unexpected column header found: {header}")
+                row.append('')
+        return row
 
+    def append_jobs_to_sheets(self, jobs_data, dry_run):
+        """Append jobs to Google Sheets, all in one request."""
+        try:
             body = {
-                'values': [row]
+                'values': [self.build_row(job_data) for job_data in jobs_data]
             }
 
             if not dry_run:
@@ -607,156 +768,331 @@ class JobsGoogleSheet:
                     body=body
                 ).execute()
 
-                # Extract the row number from the result
-                updated_range = result['updates']['updatedRange']  # e.g., "Sheet1!A11:D11"
-                row_number = int(updated_range.split('!')[1].split(':')[0][1:])
+                # Extract the first row number from the result
+                updated_range = result['updates']['updatedRange']  # e.g., "Sheet1!A11:J13"
+                first_row_number = int(RANGE_FIRST_ROW_RE.match(updated_range.split('!')[1]).group(1))
 
-                self.add_job_to_index(job_data, row_number)
+                for i, job_data in enumerate(jobs_data):
+                    self.add_job_to_index(job_data, first_row_number + i)
 
-                logger.info(f"Appended job data to Google Sheets, row {row_number}")
+                logger.info(f"Appended {len(jobs_data)} jobs to Google Sheets, from row {first_row_number}")
                 return True
             else:
-                logger.info(f"DRY-RUN: Would have appended job data to Google Sheets")
+                logger.info(f"DRY-RUN: Would have appended {len(jobs_data)} jobs to Google Sheets")
                 return True
-        except HttpError as e:
-            logger.error(f"Error appending to Google Sheets: {e}")
-            return False
-
-    def update_job_in_sheet(self, job_data, dry_run):
-
-        try:
-            row_index = self.get_job_row(job_data)
-
-            if row_index is not None and not dry_run:
-                # Update the PDF path cell
-                update_range = f"{chr(65 + self.column_indexes['pdf path'])}{row_index}"
-                update_body = {
-                    'values': [[job_data['pdf_path']]]
-                }
-
-                self.service.spreadsheets().values().update(
-                    spreadsheetId=SPREADSHEET_ID,
-                    range=update_range,
-                    valueInputOption='RAW',
-                    body=update_body
-                ).execute()
-
-                logger.info(f"Updated PDF path in sheet for job: {job_data['title']}")
-                return True
-            elif dry_run:
-                logger.info(f"DRY-RUN: Would have updated PDF path in sheet for job: {job_data['title']}")
-                return True
-            else:
-                logger.error(f"Could not find matching row for job: {job_data['title']}")
-                return False
-
         except Exception as e:
-            logger.error(f"Error updating sheet with PDF path: {e}")
+            logger.error(f"Error appending to Google Sheets: {e}")
             return False
 
-def save_job_as_pdf(input_html, job_title, department, closing_date, output_folder, file_list, dry_run):
+def job_pdf_path(output_folder, job_title, department, closing_date):
     # Create filename with closing date, or today if not available
     date = closing_date or datetime.now().strftime('%Y-%m-%d')
     filename_base = sanitize_filename(f"{date} {job_title} - {department}")
-    pdf_file_path = os.path.join(output_folder, f"{filename_base}.pdf")
-    github_token = get_github_token()
-
-    if check_if_file_exists(pdf_file_path, file_list):
-        logger.info(f"File already exists on GitHub: {pdf_file_path}")
-        return ScrapeResult.EXISTING
+    return os.path.join(output_folder, f"{filename_base}.pdf")
+
+def trim_job_page(input_html):
+    """Cut the job page down to its head and main content, so there is less to lay out in the PDF."""
+    tree = lxml.html.fromstring(input_html)
+    for element in tree.xpath('//script | //noscript | //iframe'):
+        element.drop_tree()
+
+    # Leave out the site's header, navigation, cookie banner and footer
+    main = tree.find('.//main')
+    body = tree.find('body')
+    if main is not None and body is not None:
+        for child in list(body):
+            body.remove(child)
+        body.text = None
+        main.tail = None
+        body.append(main)
+
+    return lxml.html.tostring(tree, encoding='unicode')
+
+# Set up in each pdf_pool worker process by init_pdf_worker, and reused for all its renders
+pdf_font_config = None
+pdf_image_cache = {}
+
+def init_pdf_worker():
+    global pdf_font_config
+    pdf_font_config = FontConfiguration()
+    # Load fontconfig and Pango now, rather than during the first job's render
+    HTML(string="<p></p>").write_pdf(font_config=pdf_font_config)
+
+def start_pdf_workers():
+    """Start the pdf_pool worker processes, which warm up in the background."""
+    for _ in range(PDF_POOL_WORKERS):
+        pdf_pool.submit(int)
+
+def check_not_web_font(url):
+    # Web fonts are slow to fetch and embed
+    if urlparse(url).path.lower().endswith(WEB_FONT_EXTENSIONS):
+        raise ValueError(f"Not fetching web font {url}")
+
+if URLFetcher is not None:
+    class PdfResourceFetcher(URLFetcher):
+        """WeasyPrint URL fetcher that skips web fonts."""
+        def fetch(self, url, headers=None):
+            check_not_web_font(url)
+            return super().fetch(url, headers)
+
+def fetch_pdf_resource(url):
+    """WeasyPrint url_fetcher that skips web fonts, for versions without URLFetcher."""
+    check_not_web_font(url)
+    return default_url_fetcher(url)
+
+def new_pdf_url_fetcher():
+    """The URL fetcher for rendering a job PDF, in the form this WeasyPrint version takes."""
+    return PdfResourceFetcher() if URLFetcher is not None else fetch_pdf_resource
+
+def render_pdf(input_html):
+    """Render HTML to PDF bytes. Runs in a pdf_pool worker process."""
+    html = HTML(string=trim_job_page(input_html), url_fetcher=new_pdf_url_fetcher())
+    return html.write_pdf(font_config=pdf_font_config, cache=pdf_image_cache)
+
+def save_job_as_pdf(input_html, pdf_file_path, github_token, dry_run):
+    """Render the job PDF, save a local copy and upload it as a GitHub blob, returning the blob's sha.
+
+    With no input_html, the local copy saved by an earlier run is uploaded instead.
+    """
+    if dry_run:
+        logger.info(f"DRY-RUN: Would have saved job PDF {pdf_file_path}")
+        return None
 
-    if not dry_run:
-        try:
-            html = HTML(string=input_html)
-            html.write_pdf(pdf_file_path)
+    try:
+        if input_html is None:
+            with open(pdf_file_path, 'rb') as file:
+                pdf_bytes = file.read()
+            logger.info(f"Using job PDF already saved at {pdf_file_path}")
+        else:
+            pdf_bytes = pdf_pool.submit(render_pdf, input_html).result()
+            # Write it under a temporary name first, so a run that is interrupted
+            # can't leave a partial PDF to be picked up by the next run
+            tmp_file_path = f"{pdf_file_path}.tmp"
+            try:
+                with open(tmp_file_path, 'wb') as file:
+                    file.write(pdf_bytes)
+                os.replace(tmp_file_path, pdf_file_path)
+            except Exception:
+                if os.path.exists(tmp_file_path):
+                    os.remove(tmp_file_path)
+                raise
             logger.info(f"Saved job PDF {pdf_file_path}")
-        except Exception as e:
-            logger.error(f"Error saving PDF '{pdf_file_path}': {e}")
-            raise
-    else:
-        logger.info(f"DRY-RUN: Would have saved job PDF {pdf_file_path}")
+    except Exception as e:
+        logger.error(f"Error saving PDF '{pdf_file_path}': {e}")
+        raise
 
-    if not dry_run and github_token:
-        try:
-            upload_to_github(pdf_file_path, github_token)
-        except Exception as e:
-            logger.error(f"Error uploading job PDF {pdf_file_path}: {e}")
-            raise Exception("Failed to upload to GitHub")
-        logger.info(f"Uploaded job PDF {pdf_file_path}")
-        return ScrapeResult.NEW
-    elif dry_run:
-        logger.info(f"DRY-RUN: Would have uploaded job PDF {pdf_file_path}")
-        return ScrapeResult.NEW
-    else:
-        logger.error(f"No GitHub token to upload {pdf_file_path}")
-        raise Exception("No GitHub token available")
+    if not github_token:
+        return None
 
+    # Upload the content now, while the scraping carries on. It is committed to the repo
+    # along with the other new PDFs by upload_job_pdfs, once all the jobs are scraped.
+    try:
+        return create_github_blob(pdf_bytes, github_token)
+    except Exception as e:
+        logger.error(f"Error uploading job PDF {pdf_file_path}: {e}")
+        raise
+
+def upload_job_pdfs(pdf_blobs, github_token, dry_run):
+    """Commit the job PDFs (a dict of path to blob sha) to GitHub, returning whether it succeeded."""
+    if not pdf_blobs:
+        return True
+    if dry_run:
+        logger.info(f"DRY-RUN: Would have uploaded {len(pdf_blobs)} job PDFs")
+        return True
+    if not github_token:
+        logger.error(f"No GitHub token to upload {len(pdf_blobs)} job PDFs")
+        return False
+    try:
+        upload_to_github(pdf_blobs, github_token)
+    except Exception as e:
+        logger.error(f"Error uploading job PDFs: {e}")
+        return False
+    logger.info(f"Uploaded {len(pdf_blobs)} job PDFs")
+    return True
+
+
+# Characters unsafe for filenames - anything other than letters, digits and " ._-()"
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w .()-]')
 
 def sanitize_filename(filename):
     # Replace unsafe characters for filenames
-    return "".join(c for c in filename if c.isalnum() or c in " ._-()").strip()
+    return UNSAFE_FILENAME_CHARS_RE.sub('', filename).strip()
 
 
 def fetch_all_files_from_github(github_token):
-    """Fetch a list of all files in the GitHub repository."""
+    """Fetch the (frozen) set of all file paths in the GitHub repository."""
     url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/git/trees/{REPO_BRANCH}?recursive=1"
     headers = {
         "Authorization": f"token {github_token}",
         "Accept": "application/vnd.github.v3+json"
     }
 
+    # Revalidate the list from the previous run - GitHub replies 304 if the tree is unchanged
+    cache = load_json_cache(GITHUB_TREE_CACHE_PATH)
+    if cache.get("url") == url and cache.get("etag"):
+        headers = {**headers, "If-None-Match": cache["etag"]}
+
     response = requests_session.get(url, headers=headers)
     response.raise_for_status()
-
-    tree = response.json().get("tree", [])
-    file_paths = [item["path"] for item in tree if item["type"] == "blob"]
+    if response.status_code == 304:
+        logger.info("GitHub file list unchanged since the last run")
+        return frozenset(cache["file_paths"])
+
+    # Only the job PDFs are of interest
+    data = response.json()
+    if data.get("truncated"):
+        # Too many files for GitHub to list in one go, so list each folder in turn
+        logger.info("GitHub truncated the recursive file list, fetching it folder by folder")
+        root_tree = github_git_api("GET", f"trees/{data['sha']}", github_token).get("tree", [])
+        jobs_tree_shas = [item["sha"] for item in root_tree if item["path"] == JOBS_FOLDER and item["type"] == "tree"]
+        file_paths = frozenset(fetch_github_folder_files(jobs_tree_shas[0], github_token, prefix=f"{JOBS_FOLDER}/")
+                               if jobs_tree_shas else ())
+    else:
+        file_paths = frozenset(item["path"] for item in data.get("tree", [])
+                               if item["type"] == "blob" and item["path"].startswith(f"{JOBS_FOLDER}/"))
+    if response.headers.get("ETag"):
+        save_json_cache(GITHUB_TREE_CACHE_PATH, {"url": url, "etag": response.headers["ETag"], "file_paths": sorted(file_paths)})
     return file_paths
 
-def check_if_file_exists(file_path, file_list):
-    """Check if the file exists in the GitHub file list."""
-    return file_path in file_list
-
-def upload_to_github(file_path, github_token):
+def fetch_github_folder_files(tree_sha, github_token, prefix=""):
+    """Fetch the set of file paths under a GitHub tree, one folder per request."""
+    file_paths = set()
+    for item in github_git_api("GET", f"trees/{tree_sha}", github_token).get("tree", []):
+        path = prefix + item["path"]
+        if item["type"] == "blob":
+            file_paths.add(path)
+        elif item["type"] == "tree":
+            file_paths |= fetch_github_folder_files(item["sha"], github_token, prefix=f"{path}/")
+    return file_paths
 
-    # Read file content and encode in base64
-    with open(file_path, 'rb') as file:
-        content = b64encode(file.read()).decode()
+def load_json_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    # GitHub API call
-    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{file_path}"
+def save_json_cache(path, cache):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The SID cache holds cookies that grant access to the site, so keep caches private to this user
+        # Written under a temporary name and renamed, so an interrupted run can't leave it half-written
+        fd = os.open(f"{path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)  # in case a leftover temporary file has wider permissions
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        logger.warning(f"Could not save cache {path}: {e}")
+
+def github_git_api(method, path, github_token, headers=None, **kwargs):
+    """Make a request to the repo's Git Data API, returning the response JSON."""
+    url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/git/{path}"
     headers = {
         "Authorization": f"token {github_token}",
-        "Accept": "application/vnd.github.v3+json"
+        "Accept": "application/vnd.github.v3+json",
+        **(headers or {}),
     }
-    data = {
-        "message": f"Add job listing {os.path.basename(file_path)}",
-        "content": content,
-        "REPO_BRANCH": REPO_BRANCH
-    }
-
-    response = requests_session.put(url, headers=headers, json=data)
-    if response.status_code != 201:
-        response.raise_for_status()
-        raise Exception(f"Expected 201 status, got {response.status_code} {response.body}")
+    response = requests_session.request(method, url, headers=headers, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+def create_github_blob(file_bytes, github_token):
+    """Upload file content to GitHub as a blob, returning its sha. It's not in the repo until committed."""
+    # Base64 needs no JSON escaping, so build the body as bytes directly, rather than
+    # via a str that json.dumps copies and requests then encodes again
+    body = b'{"encoding": "base64", "content": "' + b64encode(file_bytes) + b'"}'
+    return github_git_api("POST", "blobs", github_token, data=body,
+                          headers={"Content-Type": "application/json"})["sha"]
+
+def upload_to_github(blobs, github_token):
+    """Add files (a dict of path to blob sha) to the GitHub repository in a single commit."""
+    tree = [{"path": file_path, "mode": "100644", "type": "blob", "sha": blob_sha}
+            for file_path, blob_sha in blobs.items()]
+
+    if len(tree) == 1:
+        message = f"Add job listing {os.path.basename(tree[0]['path'])}"
+    else:
+        message = f"Add {len(tree)} job listings"
+
+    for attempt in range(1, GITHUB_COMMIT_ATTEMPTS + 1):
+        # Commit a tree with the new blobs on top of the branch
+        base_commit_sha = github_git_api("GET", f"ref/heads/{REPO_BRANCH}", github_token)["object"]["sha"]
+        base_tree_sha = github_git_api("GET", f"commits/{base_commit_sha}", github_token)["tree"]["sha"]
+        new_tree = github_git_api("POST", "trees", github_token, json={"base_tree": base_tree_sha, "tree": tree})
+        commit = github_git_api("POST", "commits", github_token, json={
+            "message": message,
+            "tree": new_tree["sha"],
+            "parents": [base_commit_sha],
+        })
+        try:
+            github_git_api("PATCH", f"refs/heads/{REPO_BRANCH}", github_token, json={"sha": commit["sha"]})
+            return
+        except requests.HTTPError as e:
+            # 422 means the branch moved on since it was read (not a fast-forward), so
+            # commit again on top of the new head. The blobs don't need uploading again.
+            if e.response.status_code != 422 or attempt == GITHUB_COMMIT_ATTEMPTS:
+                raise
+            logger.warning(f"{REPO_BRANCH} changed while committing job PDFs, retrying")
 
 class RateLimitedRequestsSession(requests.Session):
-    def __init__(self, rate_limit_enabled=True, delay=1.0):
+    """Session that waits `delay` seconds between requests to the same host.
+
+    Requests to a host are made one at a time, but different hosts (CSJ and GitHub)
+    don't hold each other up, so the background threads can share the session.
+    """
+    def __init__(self, rate_limit_enabled=True, delay=1.0, timeout=None):
         super().__init__()
-        self.last_request_time = 0
+        self.last_request_times = defaultdict(float)
+        self.host_locks = defaultdict(threading.Lock)
+        self.host_locks_lock = threading.Lock()
         self.rate_limit_enabled = rate_limit_enabled
         self.delay = delay
+        self.timeout = timeout
+
+    def request(self, method, url, *args, **kwargs):
+        # requests has no session-wide timeout, so apply one here unless the call sets its own
+        kwargs.setdefault('timeout', self.timeout)
+
+        if not self.rate_limit_enabled:
+            return super().request(method, url, *args, **kwargs)
 
-    def request(self, *args, **kwargs):
-        if self.rate_limit_enabled:
-            elapsed = time.time() - self.last_request_time
+        host = urlparse(url).netloc
+        with self.host_locks_lock:
+            host_lock = self.host_locks[host]
+        with host_lock:
+            elapsed = time.time() - self.last_request_times[host]
             if elapsed < self.delay:
                 time.sleep(self.delay - elapsed)
 
-        response = super().request(*args, **kwargs)
-        self.last_request_time = time.time()
-        return response
+            response = super().request(method, url, *args, **kwargs)
+            self.last_request_times[host] = time.time()
+            return response
+
+requests_session = RateLimitedRequestsSession(
+    rate_limit_enabled=not os.environ.get("DISABLE_RATELIMITING"),
+    timeout=REQUEST_TIMEOUT,
+)
+requests_session.headers.update(HEADERS)
+# Keep connections to CSJ and GitHub alive between requests, and retry transient failures
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        # POSTs too: CSJ searches and GitHub blobs/trees are safe to repeat
+        allowed_methods=frozenset(["GET", "PUT", "POST"]),
+        respect_retry_after_header=True,
+    ),
+)
+requests_session.mount("http://", _adapter)
+requests_session.mount("https://", _adapter)
 
-requests_session = RateLimitedRequestsSession(rate_limit_enabled=not os.environ.get("DISABLE_RATELIMITING"))
+# WeasyPrint rendering is CPU-bound, so it runs in separate processes to use every core
+PDF_POOL_WORKERS = os.cpu_count()
+pdf_pool = ProcessPoolExecutor(max_workers=PDF_POOL_WORKERS, initializer=init_pdf_worker)
 
 def get_github_token():
     # try file
@@ -785,6 +1121,9 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         sys.exit(1)
+    finally:
+        requests_session.close()
+        pdf_pool.shutdown()
 
     if stats.errored:
         sys.exit(1)
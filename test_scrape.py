@@ -1,9 +1,17 @@
 import unittest
+from unittest import mock
 from bs4 import BeautifulSoup
+from weasyprint import urls as weasyprint_urls
 from datetime import datetime
 
 # Import the function to test
-from scrape import scrape_job_search_result, extract_salary_range, extract_reference, job_meets_minimum_salary
+from scrape import SEARCH_RESULTS_STRAINER, JobsGoogleSheet, scrape_job_search_result, extract_salary_range, extract_reference, job_meets_minimum_salary, job_pdf_path, trim_job_page, new_pdf_url_fetcher
+
+class FixedDatetime(datetime):
+    """datetime with a fixed now(), so 'today' can't change mid-test at midnight."""
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 1, 15, 12, 0)
 
 class TestScrapeJobSearchResult(unittest.TestCase):
     def setUp(self):
@@ -30,8 +38,10 @@ class TestScrapeJobSearchResult(unittest.TestCase):
             <div class="search-results-job-box-refcode">Reference : 384891</div>
         </li>
         """
-        self.soup = BeautifulSoup(self.sample_html, 'html.parser')
+        # Parsed as scrape_jobs does, to check the strainer keeps every field
+        self.soup = BeautifulSoup(self.sample_html, 'lxml', parse_only=SEARCH_RESULTS_STRAINER)
 
+    @mock.patch('scrape.datetime', FixedDatetime)
     def test_scrape_job_search_result(self):
         # Call the function with our sample data
         job_data = scrape_job_search_result(self.soup)
@@ -48,8 +58,7 @@ class TestScrapeJobSearchResult(unittest.TestCase):
         self.assertTrue(job_data['url'].startswith('https://www.civilservicejobs.service.gov.uk/csr/index.cgi?SID='))
         
         # Check that the date field is today's date
-        today = datetime.now().strftime('%Y-%m-%d')
-        self.assertEqual(job_data['date'], today)
+        self.assertEqual(job_data['date'], '2025-01-15')
 
     def test_extract_salary_range(self):
         # Test different salary format variations
@@ -57,14 +66,16 @@ class TestScrapeJobSearchResult(unittest.TestCase):
             ('Salary : £30,000', '30000', '30000'),
             ('Salary : £30,000 to £40,000', '30000', '40000'),
             ('£30,000 - £40,000', '30000', '40000'),  # job page
+            ('Salary : From £30,000', '30000', '30000'),
+            ('Salary : Up to £40,000', '40000', '40000'),
+            ('Salary : Competitive', 'Competitive', None),
         ]
 
+        salary_div = BeautifulSoup('<div class="search-results-job-box-salary"></div>', 'lxml').div
         for salary_text, expected_min, expected_max in salary_variants:
             with self.subTest(salary_text=salary_text):
-                salary_min, salary_max = extract_salary_range(BeautifulSoup(
-                    f'<div class="search-results-job-box-salary">{salary_text}</div>', 
-                    'html.parser'
-                ))
+                salary_div.string = salary_text
+                salary_min, salary_max = extract_salary_range(salary_div)
                 self.assertEqual(salary_min, expected_min)
                 self.assertEqual(salary_max, expected_max)
 
@@ -74,13 +85,11 @@ class TestScrapeJobSearchResult(unittest.TestCase):
             ('382518', '382518'),  # job page
         ]
 
+        reference_div = BeautifulSoup('<div class="search-results-job-box-refcode"></div>', 'lxml').div
         for reference_text, expected in reference_variants:
-            soup = BeautifulSoup(
-                f'<div class="search-results-job-box-refcode">{reference_text}</div>',
-                'html.parser'
-            )
-            with self.subTest(reference_text=soup):
-                reference = extract_reference(soup)
+            with self.subTest(reference_text=reference_text):
+                reference_div.string = reference_text
+                reference = extract_reference(reference_div)
                 self.assertEqual(reference, expected)
 
     def test_closing_date_variants(self):
@@ -88,19 +97,17 @@ class TestScrapeJobSearchResult(unittest.TestCase):
             ('Closes : 11:55 pm on Wednesday 22nd January 2025', '2025-01-22'),
             ('Closes : Midday on Monday 3rd February 2025', '2025-02-03'),
             ('Apply before 11:55 pm on Friday 17th January 2025', '2025-01-17'),  # job page
+            ('Closing date: 1 March 2025', '2025-03-01'),
         ]
 
+        closing_date_div = self.soup.find('div', class_='search-results-job-box-closingdate')
         for date_text, expected_date in date_variants:
             with self.subTest(date_text=date_text):
-                # Create a new soup with the test date
-                html = self.sample_html.replace(
-                    'Closes : 11:55 pm on Wednesday 22nd January 2025',
-                    date_text
-                )
-                soup = BeautifulSoup(html, 'html.parser')
-                
+                # Swap the test date into the sample job box
+                closing_date_div.string = date_text
+
                 # Extract job data and check date
-                job_data = scrape_job_search_result(soup)
+                job_data = scrape_job_search_result(self.soup)
                 self.assertEqual(job_data['closing_date'], expected_date)
             
     def test_no_results(self):
@@ -109,7 +116,7 @@ class TestScrapeJobSearchResult(unittest.TestCase):
                 <h3>Your search matched no jobs</h3><br>
                 There are no vacancies that match your search. Try searching again with expanded criteria or expanding the postcode radius.
             </li>
-            ''', 'html.parser').find_all("li", class_="search-results-job-box")[0]
+            ''', 'lxml').find_all("li", class_="search-results-job-box")[0]
         job_data = scrape_job_search_result(soup)
         self.assertEqual(job_data, None)
 
@@ -142,6 +149,83 @@ class TestJobMeetsMinimumSalary(unittest.TestCase):
         job_data = {'salary_min': '80000', 'salary_max': '80000'}
         self.assertTrue(job_meets_minimum_salary(job_data, 80000))
 
+class TestJobPdfPath(unittest.TestCase):
+    def test_path_from_search_result_fields(self):
+        self.assertEqual(
+            job_pdf_path('jobs/gds', 'Senior Developer', 'Government Digital Service', '2025-05-28'),
+            'jobs/gds/2025-05-28 Senior Developer - Government Digital Service.pdf')
+
+    def test_unsafe_characters_removed(self):
+        self.assertEqual(
+            job_pdf_path('jobs/moj', 'Developer / Engineer', 'Ministry of Justice', '2025-05-28'),
+            'jobs/moj/2025-05-28 Developer  Engineer - Ministry of Justice.pdf')
+
+    @mock.patch('scrape.datetime', FixedDatetime)
+    def test_no_closing_date_uses_today(self):
+        self.assertEqual(
+            job_pdf_path('jobs/gds', 'Developer', 'GDS', None),
+            'jobs/gds/2025-01-15 Developer - GDS.pdf')
+
+class TestTrimJobPage(unittest.TestCase):
+    def test_keeps_head_and_main_content(self):
+        html = trim_job_page('''
+            <html><head><title>Job</title><link rel="stylesheet" href="/style.css"><script>track()</script></head>
+            <body><header>Civil Service Jobs</header><div class="wrapper"><main><h1>Senior Developer</h1></main></div>
+            <footer>Cookies</footer></body></html>''')
+        self.assertIn('<link rel="stylesheet" href="/style.css">', html)
+        self.assertIn('<body><main><h1>Senior Developer</h1></main></body>', html)
+        self.assertNotIn('track()', html)
+        self.assertNotIn('Cookies', html)
+
+    def test_page_without_main_is_kept(self):
+        html = trim_job_page('<html><body><div>Senior Developer</div><script>track()</script></body></html>')
+        self.assertEqual(html, '<html><body><div>Senior Developer</div></body></html>')
+
+class TestPdfUrlFetcher(unittest.TestCase):
+    def test_web_fonts_skipped(self):
+        with self.assertRaises(ValueError):
+            new_pdf_url_fetcher()('https://www.civilservicejobs.service.gov.uk/fonts/font.woff2')
+
+    def test_fetches_with_installed_weasyprint(self):
+        # Fetched the way the installed WeasyPrint fetches resources, to catch changes to its API
+        url_fetcher = new_pdf_url_fetcher()
+        if hasattr(weasyprint_urls, 'URLFetcher'):
+            with weasyprint_urls.fetch(url_fetcher, 'data:text/css,p%7Bcolor:red%7D') as resource:
+                self.assertEqual(resource.read(), b'p{color:red}')
+        else:
+            resource = url_fetcher('data:text/css,p%7Bcolor:red%7D')
+            self.assertEqual(resource.get('string') or resource['file_obj'].read(), b'p{color:red}')
+
+class TestJobsGoogleSheet(unittest.TestCase):
+    HEADERS = ['Scrape date', 'Job title', 'Department', 'Closing date', 'URL', 'PDF path',
+               'Salary min', 'Salary max', 'Location', 'Reference']
+
+    def sheet_with_rows(self, rows):
+        with mock.patch.object(JobsGoogleSheet, '_initialize_service') as initialize_service:
+            service = initialize_service.return_value
+            service.spreadsheets().values().get().execute.return_value = {'values': [self.HEADERS] + rows}
+            return JobsGoogleSheet()
+
+    def test_empty_cells_match_scraped_job(self):
+        # Sheets returns '' for an empty cell, and leaves off empty cells at the end of a row
+        sheet = self.sheet_with_rows([
+            ['2025-01-01', 'Developer', 'GDS', '', 'url', 'path', '50000', '60000', 'London', ''],
+            ['2025-01-01', 'Architect', 'GDS'],
+        ])
+        self.assertEqual(sheet.num_jobs, 2)
+        self.assertEqual(sheet.get_job_row(
+            {'title': 'Developer', 'department': 'GDS', 'closing_date': None, 'reference': None}), 2)
+        self.assertEqual(sheet.get_job_row(
+            {'title': 'Architect', 'department': 'GDS', 'closing_date': None, 'reference': None}), 3)
+
+    def test_empty_reference_not_indexed(self):
+        sheet = self.sheet_with_rows([
+            ['2025-01-01', 'Developer', 'GDS', '2025-02-01', 'url', 'path', '50000', '60000', 'London', ''],
+        ])
+        self.assertNotIn('', sheet.job_index)
+        self.assertIsNone(sheet.get_job_row(
+            {'title': 'Architect', 'department': 'GDS', 'closing_date': '2025-02-01', 'reference': ''}))
+
 
 if __name__ == '__main__':
     unittest.main()